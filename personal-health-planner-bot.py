@@ -1,15 +1,179 @@
-import json
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import ijson
 import streamlit as st
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+if TYPE_CHECKING:
+    # agno and openai are imported lazily when first needed to keep the first paint fast.
+    from agno.agent import Agent
+    from openai import OpenAI
+
+try:
+    # orjson is a C-backed parser several times faster than the stdlib on multi-KB plans;
+    # it takes str directly, so the response is never re-encoded to bytes.
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Plan fields with the one-line guidance the agent gets for each; the response schema
+# enforces the structure, so the prompt only has to describe the content.
+_DIETARY_GUIDANCE = (
+    ("meal_plan", "exactly one '### Breakfast', '### Lunch', '### Snacks' and '### Dinner' section, each with portions"),
+    ("nutritional_breakdown", "bulleted totals for calories, protein, carbohydrates and fats"),
+    ("rationale", "why the plan supports the user's health and fitness goals"),
+    ("meal_preparation_tips", "practical advice for prepping and cooking the meals"),
+    ("important_considerations", "extra tips such as hydration, fiber intake and electrolyte balance"),
+)
+_FITNESS_GUIDANCE = (
+    ("warmup", "a brief routine of dynamic stretches or light exercises"),
+    ("main_workout", "specific exercises with sets, repetitions or durations"),
+    ("cooldown", "static stretches or relaxation exercises to aid recovery"),
+    ("benefits", "how the workout supports the user's fitness goals"),
+    ("safety_guidelines", "essential safety tips and modifications"),
+)
+
+# Keys the agent returns for each plan.
+DIETARY_PLAN_KEYS = tuple(key for key, _ in _DIETARY_GUIDANCE)
+FITNESS_PLAN_KEYS = tuple(key for key, _ in _FITNESS_GUIDANCE)
+
+def _string_fields_schema(keys: tuple) -> dict:
+    return {
+        "type": "object",
+        "properties": {key: {"type": "string"} for key in keys},
+        "required": list(keys),
+        "additionalProperties": False,
+    }
+
+# Display layouts: rows of columns of (title, key, default) sections.
+_DIET_SECTIONS = (
+    (
+        (("Meal Plan", "meal_plan", "Meal plan not available"),),
+        (
+            ("Meal Preparation Tips", "meal_preparation_tips", "Meal preparation tips not provided"),
+            ("Nutritional Breakdown", "nutritional_breakdown", "Nutritional breakdown not available"),
+            ("Rationale", "rationale", "Rationale not provided"),
+            ("Important Considerations", "important_considerations", "Important considerations not provided"),
+        ),
+    ),
+)
+_FITNESS_SECTIONS = (
+    # Three columns for the workout phases.
+    (
+        (("Warm-up", "warmup", "Warm-up routine not available."),),
+        (("Main Workout", "main_workout", "Main workout details not available."),),
+        (("Cool-down", "cooldown", "Cool-down routine not available."),),
+    ),
+    # Benefits and Safety Guidelines spanning the full width.
+    (
+        (("Benefits", "benefits", "Benefits not provided."),),
+        (("Safety Guidelines", "safety_guidelines", "Safety guidelines not provided."),),
+    ),
+)
+
+# Strict structured-output schema so the model returns bare JSON with exactly these keys.
+HEALTH_PLAN_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "health_plan",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "dietary": _string_fields_schema(DIETARY_PLAN_KEYS),
+                "fitness": _string_fields_schema(FITNESS_PLAN_KEYS),
+            },
+            "required": ["dietary", "fitness"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Page-wide styles, injected once by _inject_css.
+_CSS = """
+<style>
+.block-container {
+    padding-left: 1rem !important;
+    padding-right: 1rem !important;
+}
+/* Center and adjust the width of all text inputs */
+div[data-testid="stTextInput"] {
+    max-width: 1200px;
+    margin-left: auto;
+    margin-right: auto;
+}
+</style>
+"""
+
+# Profile summary sent to the agent; render_profile appends the optional fields that were filled in.
+_PROFILE_TMPL = """**Basic Info:**
+- Age: {age}
+- Height: {height} cm
+- Weight: {weight} kg
+
+**Lifestyle & Goals:**
+- Sex: {sex}
+- Activity Level: {activity_level}
+- Fitness Goals: {fitness_goals}
+- Dietary Preferences: {dietary_preferences}
+
+**Additional Details:**
+- Sleep Quality: {sleep_quality}
+- Stress Level: {stress_level}"""
+
+def build_system_message(role: str, instructions: list) -> str:
+    """
+    Join an agent's role and instructions into one static system message using agno's
+    <your_role>/<instructions> layout, built once at import instead of on every run.
+    """
+    bullets = "\n".join(f"- {instruction}" for instruction in instructions)
+    return f"<your_role>\n{role}\n</your_role>\n\n<instructions>\n{bullets}\n</instructions>"
+
+HEALTH_SYSTEM_MESSAGE = build_system_message(
+    "Provides personalized dietary and fitness recommendations",
+    [
+        "Write a one-day meal plan and workout plan for the user's profile, respecting their dietary restrictions, preferences, fitness goals and activity level.",
+        "Every field is markdown text; never repeat the field's own title (e.g. 'Warm-up:') as a heading.",
+        *(f"dietary.{key}: {guidance}." for key, guidance in _DIETARY_GUIDANCE),
+        *(f"fitness.{key}: {guidance}." for key, guidance in _FITNESS_GUIDANCE),
+    ]
+)
+
+def format_plan_sections(plan: dict, layout: tuple) -> tuple:
+    """
+    Pre-format a plan into the markdown of each section, nested in the same rows and
+    columns as the layout of (title, key, default) sections. The result is what gets
+    stored in st.session_state, so reruns only have to emit ready-made strings.
+    """
+    return tuple(
+        tuple(
+            tuple(f"## {title}\n\n{plan.get(key, default)}" for title, key, default in sections)
+            for sections in row
+        )
+        for row in layout
+    )
 
-def display_dietary_plan(plan: dict) -> None:
+def render_plan_sections(formatted: tuple) -> None:
+    """
+    Emit sections pre-formatted by format_plan_sections, one markdown element each.
+    """
+    for row in formatted:
+        for column, sections in zip(st.columns(len(row)), row):
+            with column:
+                for markdown in sections:
+                    st.markdown(markdown)
+
+def display_dietary_plan(sections: tuple) -> None:
     """
     Display the dietary plan in an expander with two columns:
       - Column 1: Meal Plan
       - Column 2: Nutritional Breakdown, Rationale, Meal Preparation Tips, and Important Considerations.
     
-    Expects the plan to be a dictionary with the following keys:
+    Expects the sections returned by format_plan_sections for _DIET_SECTIONS, built from a
+    plan dictionary with the following keys:
       - meal_plan: A markdown-formatted string for the detailed meal plan.
       - nutritional_breakdown: A markdown-formatted string summarizing key nutritional metrics.
       - rationale: A markdown-formatted string explaining why the plan supports the user's goals.
@@ -17,34 +181,18 @@ def display_dietary_plan(plan: dict) -> None:
       - important_considerations: A markdown-formatted string listing additional dietary tips.
     """
     with st.expander("📋 Your Personalized Dietary Plan", expanded=True):
-        col1, col2 = st.columns(2)
-        
-        # Column 1: Meal Plan
-        with col1:
-            st.markdown("## Meal Plan")
-            st.markdown(plan.get("meal_plan", "Meal plan not available"))
-
-
-        # Column 2: Other sections
-        with col2:
-            st.markdown("## Meal Preparation Tips")
-            st.markdown(plan.get("meal_preparation_tips", "Meal preparation tips not provided"))
-            st.markdown("## Nutritional Breakdown")
-            st.markdown(plan.get("nutritional_breakdown", "Nutritional breakdown not available"))
-            st.markdown("## Rationale")
-            st.markdown(plan.get("rationale", "Rationale not provided"))
-            st.markdown("## Important Considerations")
-            st.markdown(plan.get("important_considerations", "Important considerations not provided"))
-
-
-def display_fitness_plan(plan: dict) -> None:
+        render_plan_sections(sections)
+
+
+def display_fitness_plan(sections: tuple) -> None:
     """
     Display the fitness plan in an expander with a visually appealing layout.
     The layout includes:
       - Three columns for Warm-up, Main Workout, and Cool-down.
       - Full-width sections for Benefits and Safety Guidelines.
     
-    Expects the plan to be a dictionary with the following keys:
+    Expects the sections returned by format_plan_sections for _FITNESS_SECTIONS, built from a
+    plan dictionary with the following keys:
       - warmup: Plain string with the warm-up routine.
       - main_workout: Plain string with the main workout details.
       - cooldown: Plain string with the cool-down routine.
@@ -52,123 +200,142 @@ def display_fitness_plan(plan: dict) -> None:
       - safety_guidelines: Plain string with essential safety tips.
     """
     with st.expander("💪 Your Personalized Fitness Plan", expanded=True):
-        # Create three columns for the workout phases.
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.markdown("## Warm-up")
-            st.markdown(plan.get("warmup", "Warm-up routine not available."))
-        with col2:
-            st.markdown("## Main Workout")
-            st.markdown(plan.get("main_workout", "Main workout details not available."))
-        with col3:
-            st.markdown("## Cool-down")
-            st.markdown(plan.get("cooldown", "Cool-down routine not available."))
-        
-        # Display Benefits and Safety Guidelines spanning the full width.
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("## Benefits")
-            st.markdown(plan.get("benefits", "Benefits not provided."))
-        with col2:
-            st.markdown("## Safety Guidelines")
-            st.markdown(plan.get("safety_guidelines", "Safety guidelines not provided."))
-
-def extract_json_from_string(text: str) -> dict:
-    # Split the text into lines
-    lines = text.splitlines()
-    # Filter out lines that start with the code fence (``` or ```json)
-    json_lines = [line for line in lines if not line.strip().startswith("```")]
-    # Join the remaining lines back into a single string
-    json_str = "\n".join(json_lines)
-    # Parse the JSON string into a dictionary
-    return json.loads(json_str)
-
-def initialize_openai_model():
-    try:
-        api_key = st.session_state.openai_api_key
-        return OpenAIChat(id='gpt-4o', api_key=api_key)
-    except Exception as e:
-        st.error(f"❌ Error initializing OpenAI Model: {e}")
-        return None
-
-def generate_dietary_plan(openai_model, user_profile: str) -> dict:
-    dietary_agent = Agent(
-        name="Dietary Expert",
-        role="Provides personalized dietary recommendations",
-        model=openai_model,
-        instructions = [
-            "Consider the user's profile, including any dietary restrictions and preferences.",
-            "Generate a detailed daily meal plan that includes exactly one section for each meal: Breakfast, Lunch, Snacks, and Dinner, each with portion recommendations.",
-            "Within the 'meal_plan' value, format the meal headings (Breakfast, Lunch, Snacks, Dinner) using markdown, for example '### Breakfast'.",
-            "Include a section for Nutritional Breakdown summarizing key nutritional metrics (e.g., total calories, protein, carbohydrates, fats) as a bulleted list. For instance:\n- Total Calories: 2500 kcal\n- Protein: 150g\n- Carbohydrates: 300g\n- Fats: 100g",
-            "Include a section for Rationale explaining why the plan supports the user's health and fitness goals.",
-            "Include a section for Meal Preparation Tips with practical advice for prepping and cooking the meals.",
-            "Include a section for Important Considerations listing additional tips (e.g., hydration, fiber intake, electrolyte balance).",
-            "Return your response as a valid JSON object with the keys: 'meal_plan', 'nutritional_breakdown', 'rationale', 'meal_preparation_tips', and 'important_considerations'.",
-            "Each value must be a plain string (single-depth) that can include multiple lines and markdown formatting, with no nested objects.",
-            "Ensure that there is exactly ONE section for each meal (Breakfast, Lunch, Snacks, and Dinner) in the 'meal_plan' value, and avoid repeating any section headings."
-        ]
-    )
+        render_plan_sections(sections)
 
-    response = dietary_agent.run(user_profile)
-    try:
-        plan = extract_json_from_string(response.content)
-    except Exception as e:
-        st.error(f"Failed to parse JSON response: {e}")
-        plan = {
-            "meal_plan": "Plan not available",
-            "nutritional_breakdown": "Not available",
-            "rationale": "Not provided",
-            "meal_preparation_tips": "Not provided",
-            "important_considerations": "Not provided"
-        }
-    return plan
-
-def generate_fitness_plan(openai_model, user_profile: str) -> dict:
+def stream_agent_response(agent: "Agent", user_profile: str, on_section=None) -> str:
     """
-    Generate a personalized fitness plan based on the user's profile.
-    
-    The agent is instructed to return a valid JSON object with the following keys:
-      - warmup: A recommended warm-up routine.
-      - main_workout: A detailed main workout routine.
-      - cooldown: A cool-down routine with stretching or relaxation exercises.
-      - benefits: A brief explanation of how this workout supports the user's fitness goals.
-      - safety_guidelines: Essential safety tips and any suggested modifications.
-    
-    Each value should be a plain string that may include markdown formatting and multiple lines.
+    Run the agent with streaming enabled and return the full response text.
+
+    When on_section is given, the JSON is parsed incrementally while tokens arrive and
+    on_section(path, value) is called as soon as each string value is complete, where path
+    is its dotted location in the object (e.g. "dietary.meal_plan").
+    The preview is best-effort; the returned text is still parsed in full by the caller.
+    """
+    chunks = []
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events)
+    previewing = on_section is not None
+    for chunk in agent.run(user_profile, stream=True):
+        text = chunk.content
+        if not isinstance(text, str) or not text:
+            continue
+        chunks.append(text)
+        if not previewing:
+            continue
+        try:
+            parser.send(text.encode("utf-8"))
+        except ijson.JSONError:
+            previewing = False
+        for prefix, event, value in events:
+            if event == "string" and prefix:
+                on_section(prefix, value)
+        del events[:]
+    return "".join(chunks)
+
+# httpx drops idle pooled connections after 5 seconds by default, long before the user has
+# finished the profile; keep them for minutes and re-warm at most once a minute per session.
+_KEEPALIVE_SECONDS = 300.0
+_WARM_UP_INTERVAL_SECONDS = 60.0
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def get_openai_client(api_key: str) -> "OpenAI":
+    """
+    Create the OpenAI client for an API key with a long-lived keep-alive connection pool.
+    """
+    import httpx
+    from openai import DefaultHttpxClient, OpenAI
+
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=100,
+                          keepalive_expiry=_KEEPALIVE_SECONDS)
+    return OpenAI(api_key=api_key, http_client=DefaultHttpxClient(limits=limits))
+
+def warm_up_openai_client(api_key: str) -> None:
+    """
+    Open a keep-alive TLS connection to the API in the background, throttled per session.
+
+    The throwaway models.list() call runs while the user is still filling in the profile,
+    so the first plan request skips the handshake.
     """
-    fitness_agent = Agent(
-        name="Fitness Expert",
-        role="Provides personalized fitness recommendations",
-        model=openai_model,
-        instructions=[
-            "Consider the user's profile, including their fitness goals, current activity level, and personal preferences.",
-            "Generate a comprehensive fitness plan that covers warm-up, main workout, cool-down, benefits, and safety guidelines. Do NOT include headings like 'Warm-up:', 'Main Workout:', 'Cool-down:', 'Benefits:', or 'Safety Guidelines:' in the text itself. Instead, just provide the text for each section.",
-            "Include a section for Warm-up that provides a brief routine with dynamic stretches or light exercises to prepare the body.",
-            "Include a section for Main Workout that details specific exercises along with recommended sets, repetitions, or durations.",
-            "Include a section for Cool-down that describes static stretches or relaxation exercises to aid recovery.",
-            "Include a section for Benefits that explains how this workout plan supports the user's fitness goals.",
-            "Include a section for Safety Guidelines that lists essential tips and modifications to ensure a safe and effective workout.",
-            "Return your response as a valid JSON object with the keys: 'warmup', 'main_workout', 'cooldown', 'benefits', and 'safety_guidelines'.",
-            "Each value must be a plain string (single-depth) that can include multiple lines and markdown formatting, with no nested objects."
-        ]
+    now = time.monotonic()
+    warmed_key, warmed_at = st.session_state.get("openai_warmed", (None, float("-inf")))
+    if warmed_key == api_key and now - warmed_at < _WARM_UP_INTERVAL_SECONDS:
+        return
+    st.session_state.openai_warmed = (api_key, now)
+    client = get_openai_client(api_key)
+
+    def warm_up() -> None:
+        try:
+            client.models.list()
+        except Exception:
+            # A bad key or network error resurfaces on the real request.
+            pass
+
+    threading.Thread(target=warm_up, name="openai-warm-up", daemon=True).start()
+
+def build_health_agent(api_key: str) -> "Agent":
+    """
+    Build a fresh health expert agent for a single run.
+
+    agno agents keep per-run state (memory, run_id, run_response), so they are never cached
+    or shared between runs; only the thread-safe OpenAI client is reused.
+    """
+    from agno.agent import Agent
+    from agno.models.openai import OpenAIChat
+
+    return Agent(
+        name="Health Expert",
+        role="Provides personalized dietary and fitness recommendations",
+        # Passed through request_params because agno resets Model.response_format on
+        # every run when the agent has no response_model.
+        model=OpenAIChat(
+            id='gpt-4o',
+            api_key=api_key,
+            client=get_openai_client(api_key),
+            request_params={"response_format": HEALTH_PLAN_RESPONSE_FORMAT}
+        ),
+        system_message=HEALTH_SYSTEM_MESSAGE
     )
 
-    response = fitness_agent.run(user_profile)
-    try:
-        plan = extract_json_from_string(response.content)
-    except Exception as e:
-        st.error(f"Failed to parse JSON response: {e}")
-        plan = {
-            "warmup": "Not available",
-            "main_workout": "Not available",
-            "cooldown": "Not available",
-            "benefits": "Not provided",
-            "safety_guidelines": "Not provided"
-        }
-    return plan
-
-def render_profile() -> str:
+@st.cache_data(ttl=3600, max_entries=128, show_spinner=False)
+def generate_health_plan(api_key: str, _user_profile: str, profile_hash: int, _on_section=None) -> dict:
+    """
+    Generate the dietary and fitness plans for the user's profile in a single agent call.
+
+    The model is constrained by HEALTH_PLAN_RESPONSE_FORMAT to return a JSON object with two keys:
+      - dietary: An object with the meal_plan, nutritional_breakdown, rationale,
+        meal_preparation_tips and important_considerations strings.
+      - fitness: An object with the warmup, main_workout, cooldown, benefits and
+        safety_guidelines strings.
+
+    Each value is a plain string that may include markdown formatting and multiple lines.
+    Results are cached per API key and profile_hash, so plans are never served across keys;
+    Streamlit keys the cache on a digest of the arguments and never stores the key itself.
+    Failed runs raise and are never cached.
+    """
+    text = stream_agent_response(build_health_agent(api_key), _user_profile, _on_section)
+    return json_loads(text)
+
+def profile_fingerprint(*fields) -> int:
+    """
+    Hash the raw profile field values into a cache key for generated plans.
+
+    Uses the built-in tuple hash, which runs in C without building an intermediate string.
+    Its per-process string seed is fine because the plan cache lives in this process.
+    """
+    return hash(tuple(field.lower() if isinstance(field, str) else field for field in fields))
+
+@st.fragment
+def render_profile() -> None:
+    """
+    Collect the user's profile inside a fragment so editing a field reruns only this form.
+
+    The rendered profile summary and its fingerprint are stored in st.session_state as
+    user_profile and profile_hash.
+    """
+    if "openai_api_key" in st.session_state:
+        # Profile edits rerun only this fragment, so this is where the pool is kept warm.
+        warm_up_openai_client(st.session_state.openai_api_key)
+
     st.header("👤 Your Profile")
     # Create three columns for different groups of fields.
     col1, col2, col3 = st.columns(3)
@@ -209,43 +376,75 @@ def render_profile() -> str:
         medical_conditions = st.text_area("Medical Conditions (optional)", placeholder="e.g., asthma, allergies")
         food_allergies = st.text_area("Food Allergies (optional)", placeholder="List any food allergies")
 
-    # Construct a profile summary string to display
-    profile = f"""
-        **Basic Info:**
-        - Age: {age}
-        - Height: {height} cm
-        - Weight: {weight} kg
-
-        **Lifestyle & Goals:**
-        - Sex: {sex}
-        - Activity Level: {activity_level}
-        - Fitness Goals: {fitness_goals}
-        - Dietary Preferences: {dietary_preferences}
-
-        **Additional Details:**
-        - Sleep Quality: {sleep_quality}
-        - Stress Level: {stress_level}
-        - Medical Conditions: {medical_conditions if medical_conditions.strip() else 'None'}
-        - Food Allergies: {food_allergies if food_allergies.strip() else 'None'}
+    medical_conditions = medical_conditions.strip()
+    food_allergies = food_allergies.strip()
+
+    # Only mention the optional fields when they were filled in, to keep the prompt short
+    lines = [_PROFILE_TMPL.format_map(locals())]
+    if medical_conditions:
+        lines.append(f"- Medical Conditions: {medical_conditions}")
+    if food_allergies:
+        lines.append(f"- Food Allergies: {food_allergies}")
+
+    # Commit the profile summary and its cache key for main() to pick up on submit
+    st.session_state.user_profile = "\n".join(lines)
+    st.session_state.profile_hash = profile_fingerprint(
+        age, height, weight, sex, activity_level, fitness_goals, dietary_preferences,
+        sleep_quality, stress_level, medical_conditions, food_allergies
+    )
+
+def build_recommendations(dietary_plan: dict, fitness_plan: dict) -> str:
+    """
+    Assemble the downloadable text version of both plans. Built once per generation and
+    kept in st.session_state alongside the formatted sections.
     """
+    return "".join([
+        "### Dietary Plan\n",
+        "**Meal Plan:**\n", dietary_plan.get("meal_plan", "Plan not available"), "\n\n",
+        "**Nutritional Breakdown:**\n", dietary_plan.get("nutritional_breakdown", "Not available"), "\n\n",
+        "**Rationale:**\n", dietary_plan.get("rationale", "Not provided"), "\n\n",
+        "**Meal Preparation Tips:**\n", dietary_plan.get("meal_preparation_tips", "Not provided"), "\n\n",
+        "**Important Considerations:**\n", dietary_plan.get("important_considerations", "Not provided"), "\n\n",
+        "### Fitness Plan\n",
+        "**Warm-up:**\n", fitness_plan.get("warmup", "Not available"), "\n\n",
+        "**Main Workout:**\n", fitness_plan.get("main_workout", "Not available"), "\n\n",
+        "**Cool-down:**\n", fitness_plan.get("cooldown", "Not available"), "\n\n",
+        "**Benefits:**\n", fitness_plan.get("benefits", "Not provided"), "\n\n",
+        "**Safety Guidelines:**\n", fitness_plan.get("safety_guidelines", "Not provided"),
+    ])
 
-    return profile
+@st.fragment
+def show_plan_footer() -> None:
+    """
+    Show the disclaimer and the download button inside a fragment, so clicking the download
+    button reruns only this block instead of the whole script.
+    """
+    st.markdown("""
+    **Disclaimer:** The health and fitness plans provided by this application are generated by an AI model and are intended for informational purposes only. For a comprehensive evaluation and personalized advice, please consult a certified health or fitness expert.
+    """)
+    st.download_button(
+        "💾 Download Recommendations",
+        data=st.session_state.recommendations,
+        file_name="personal_health_plan.txt",
+        mime="text/plain"
+    )
 
+def show_plans() -> None:
+    """
+    Display the generated plans stored in st.session_state, followed by the plan footer.
+    """
+    display_dietary_plan(st.session_state.plan_sections["dietary"])
+    display_fitness_plan(st.session_state.plan_sections["fitness"])
+    show_plan_footer()
 
+@st.cache_resource(show_spinner=False)
+def _inject_css() -> None:
+    # Cached so the stylesheet is built once and replayed as a single element on reruns
+    st.markdown(_CSS, unsafe_allow_html=True)
 
 def main() -> None:
     st.set_page_config(page_title="Personal Health Planner Bot", page_icon="🏋️‍♂️", layout="wide")
-    st.markdown(
-        """
-        <style>
-        .block-container {
-            padding-left: 1rem !important;
-            padding-right: 1rem !important;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+    _inject_css()
 
     st.markdown("<h1 style='font-size: 2.5rem;'>🏋️‍♂️ Personal Health Planner Bot</h1>", unsafe_allow_html=True)
     st.markdown(
@@ -253,19 +452,6 @@ def main() -> None:
         unsafe_allow_html=True
     )
 
-    st.markdown(
-        """
-        <style>
-        /* Center and adjust the width of all text inputs */
-        div[data-testid="stTextInput"] {
-            max-width: 1200px;
-            margin-left: auto;
-            margin-right: auto;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
     # Get the OpenAI API key.
     openai_api_key = st.text_input(
         "OpenAI API Key",
@@ -276,88 +462,94 @@ def main() -> None:
         st.session_state.openai_api_key = openai_api_key 
         st.success("✅ API key updated!")
 
-    user_profile = render_profile()
+    render_profile()
+    user_profile = st.session_state.user_profile
+    profile_hash = st.session_state.profile_hash
 
     # If plans have been generated already, always display them.
     if st.session_state.get("plans_generated", False):
-        display_dietary_plan(st.session_state.dietary_plan)
-        display_fitness_plan(st.session_state.fitness_plan)
-        combined_recommendations = (
-            "### Dietary Plan\n" +
-            "**Meal Plan:**\n" + st.session_state.dietary_plan.get("meal_plan", "Plan not available") + "\n\n" +
-            "**Nutritional Breakdown:**\n" + st.session_state.dietary_plan.get("nutritional_breakdown", "Not available") + "\n\n" +
-            "**Rationale:**\n" + st.session_state.dietary_plan.get("rationale", "Not provided") + "\n\n" +
-            "**Meal Preparation Tips:**\n" + st.session_state.dietary_plan.get("meal_preparation_tips", "Not provided") + "\n\n" +
-            "**Important Considerations:**\n" + st.session_state.dietary_plan.get("important_considerations", "Not provided") + "\n\n" +
-            "### Fitness Plan\n" +
-            "**Warm-up:**\n" + st.session_state.fitness_plan.get("warmup", "Not available") + "\n\n" +
-            "**Main Workout:**\n" + st.session_state.fitness_plan.get("main_workout", "Not available") + "\n\n" +
-            "**Cool-down:**\n" + st.session_state.fitness_plan.get("cooldown", "Not available") + "\n\n" +
-            "**Benefits:**\n" + st.session_state.fitness_plan.get("benefits", "Not provided") + "\n\n" +
-            "**Safety Guidelines:**\n" + st.session_state.fitness_plan.get("safety_guidelines", "Not provided")
-        )
-        st.markdown("""
-        **Disclaimer:** The health and fitness plans provided by this application are generated by an AI model and are intended for informational purposes only. For a comprehensive evaluation and personalized advice, please consult a certified health or fitness expert.
-        """)
-        st.download_button(
-            "💾 Download Recommendations",
-            data=combined_recommendations,
-            file_name="personal_health_plan.txt",
-            mime="text/plain"
-        )
+        show_plans()
     else:
         # Only show the Generate button if the plans have not been generated.
         if st.button("🎯 Generate My Personalized Health Plan", use_container_width=True):
             if not hasattr(st.session_state, "openai_api_key"): 
                 st.error("Please provide openai_api_key")
             else:
-                openai_model = initialize_openai_model() 
-                with st.spinner("Creating your customized Health Plan ..."):
-                    try:
-                        # Generate dietary plan.
-                        dietary_plan = generate_dietary_plan(openai_model, user_profile)
-                        st.session_state.dietary_plan = dietary_plan
-                        display_dietary_plan(dietary_plan)
-                    except Exception as e:
-                        st.error(f"❌ An error occurred: {e}")
-
-                with st.spinner("Creating your customized Fitness Plan ..."):
-                    try:
-                        # Generate fitness plan.
-                        fitness_plan = generate_fitness_plan(openai_model, user_profile)
-                        st.session_state.fitness_plan = fitness_plan
-                        display_fitness_plan(fitness_plan)
-                    except Exception as e:
-                        st.error(f"❌ An error occurred: {e}")
+                with st.spinner("Creating your customized Health and Fitness Plans ..."):
+                    # Both plans come from one agent call. It runs on a worker thread that only
+                    # posts completed sections to a queue; all rendering happens here so each
+                    # plan fills in progressively as its sections stream in.
+                    plan_views = {
+                        "dietary": (display_dietary_plan, _DIET_SECTIONS, DIETARY_PLAN_KEYS),
+                        "fitness": (display_fitness_plan, _FITNESS_SECTIONS, FITNESS_PLAN_KEYS),
+                    }
+                    status = st.empty()
+                    placeholders = {name: st.empty() for name in plan_views}
+                    partial_plans = {name: dict.fromkeys(view[2], "_Generating..._") for name, view in plan_views.items()}
+                    sections = queue.Queue()
+                    api_key = st.session_state.openai_api_key
+
+                    def run_generation() -> None:
+                        # The final result (or error) is always posted with a None path to end
+                        # the stream, so the loop below can never wait on a dead worker.
+                        result = None
+                        try:
+                            result = generate_health_plan(
+                                api_key,
+                                user_profile,
+                                profile_hash,
+                                lambda path, text: sections.put((path, text)),
+                            )
+                        except BaseException as e:
+                            result = e
+                        finally:
+                            sections.put((None, result))
+
+                    worker = threading.Thread(target=run_generation, name="health-plan", daemon=True)
+                    add_script_run_ctx(worker)
+                    worker.start()
+
+                    # Block on the queue so each section is drawn the moment it arrives. Stop and
+                    # reruns only take effect when the script sends something to the browser, so
+                    # a quiet stretch of the stream refreshes the elapsed time once a second.
+                    started = time.monotonic()
+                    while True:
+                        try:
+                            path, payload = sections.get(timeout=1.0)
+                        except queue.Empty:
+                            status.caption(f"⏳ Still generating... {time.monotonic() - started:.0f}s")
+                            continue
+                        if path is None:
+                            break
+                        name, _, section = path.partition(".")
+                        if name in partial_plans and section:
+                            partial_plans[name][section] = payload
+                            display, layout, _ = plan_views[name]
+                            with placeholders[name].container():
+                                display(format_plan_sections(partial_plans[name], layout))
+                    status.empty()
+
+                    if isinstance(payload, BaseException):
+                        # Nothing was generated, so drop the partial previews and leave the
+                        # Generate button in place for a retry.
+                        for placeholder in placeholders.values():
+                            placeholder.empty()
+                        st.error(f"❌ An error occurred: {payload}")
+                        return
+                    # Keep only the formatted output; reruns never need the raw plan dicts again.
+                    plan_sections = {}
+                    for name, (display, layout, _) in plan_views.items():
+                        plan_sections[name] = format_plan_sections(payload.get(name, {}), layout)
+                        with placeholders[name].container():
+                            display(plan_sections[name])
+                    st.session_state.plan_sections = plan_sections
+                    st.session_state.recommendations = build_recommendations(
+                        payload.get("dietary", {}), payload.get("fitness", {})
+                    )
 
                 st.session_state.plans_generated = True
                 st.session_state.qa_pairs = []
-                
-                st.markdown("""
-                **Disclaimer:** The health and fitness plans provided by this application are generated by an AI model and are intended for informational purposes only. For a comprehensive evaluation and personalized advice, please consult a certified health or fitness expert.
-                """)
-                
-                combined_recommendations = (
-                    "### Dietary Plan\n" +
-                    "**Meal Plan:**\n" + st.session_state.dietary_plan.get("meal_plan", "Plan not available") + "\n\n" +
-                    "**Nutritional Breakdown:**\n" + st.session_state.dietary_plan.get("nutritional_breakdown", "Not available") + "\n\n" +
-                    "**Rationale:**\n" + st.session_state.dietary_plan.get("rationale", "Not provided") + "\n\n" +
-                    "**Meal Preparation Tips:**\n" + st.session_state.dietary_plan.get("meal_preparation_tips", "Not provided") + "\n\n" +
-                    "**Important Considerations:**\n" + st.session_state.dietary_plan.get("important_considerations", "Not provided") + "\n\n" +
-                    "### Fitness Plan\n" +
-                    "**Warm-up:**\n" + st.session_state.fitness_plan.get("warmup", "Not available") + "\n\n" +
-                    "**Main Workout:**\n" + st.session_state.fitness_plan.get("main_workout", "Not available") + "\n\n" +
-                    "**Cool-down:**\n" + st.session_state.fitness_plan.get("cooldown", "Not available") + "\n\n" +
-                    "**Benefits:**\n" + st.session_state.fitness_plan.get("benefits", "Not provided") + "\n\n" +
-                    "**Safety Guidelines:**\n" + st.session_state.fitness_plan.get("safety_guidelines", "Not provided")
-                )
-                
-                st.download_button(
-                    "💾 Download Recommendations",
-                    data=combined_recommendations,
-                    file_name="personal_health_plan.txt",
-                    mime="text/plain"
-                )
+                show_plan_footer()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file